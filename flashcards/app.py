@@ -1,35 +1,460 @@
+import array
+import bisect
+import functools
+import hashlib
+import io
+import itertools
 import json
+import mmap
 import os
 import random
-import uuid
-from typing import Dict, Any, List, Optional
-
+import secrets
+import struct
+import sys
+from typing import Callable, Dict, Any, List, Optional, Set, Tuple
+
+# Collection name -> card count. Small enough to read in full at startup.
+INDEX_FILE = "flashcards.idx.json"
+# One file per collection, loaded the first time that collection is opened.
+CARDS_DIR = "cards"
+# Single-file layout used before INDEX_FILE existed; migrated on first run.
 DATA_FILE = "flashcards.json"
+# Card edits are appended here as JSON lines and folded into the card files later.
+WAL_FILE = "flashcards.wal"
+WAL_COMPACT_SIZE = 64 * 1024
+
+_wal: Optional[io.BufferedWriter] = None
+_dirty = False
+# Collections changed since their card file was last written.
+_dirty_cols: Set[str] = set()
+# Files replaced since the last commit().
+_unsynced: Set[str] = set()
+# col_name -> {card_id: position in that collection's arrays}
+_card_index: Dict[str, Dict[str, int]] = {}
+# col_name -> (casefolded text of every card joined together, start offset of
+# each card followed by the text's length)
+_search_cache: Dict[str, Tuple[str, List[int]]] = {}
+# col_name -> {casefolded 3-character substring: ids of cards containing it}
+_gram_index: Dict[str, Dict[str, Set[str]]] = {}
+# Sorted collection names; None until first needed after a load or delete.
+_cols_cache: Optional[List[str]] = None
+# Messages from work done outside a menu (e.g. loading a damaged card file),
+# held for the next menu repaint so clear() doesn't wipe them unread.
+_notices: List[str] = []
+
+
+# ----------------------------
+# Cards
+# ----------------------------
+class Card:
+    """A single card's fields, as shown by learn mode.
+
+    Collections keep their cards as parallel lists (see get_collection); learn
+    mode reads one position at a time, either from those lists or from a
+    mapped card file. Slots keep it to three pointers with no per-instance
+    dict.
+    """
+
+    __slots__ = ("id", "front", "back")
+
+    def __init__(self, card_id: str, front: str, back: str) -> None:
+        self.id = card_id
+        self.front = front
+        self.back = back
+
+
+def get_card(col: Dict[str, Any], n: int) -> Card:
+    return Card(col["ids"][n], col["fronts"][n], col["backs"][n])
 
 
 # ----------------------------
 # Storage
 # ----------------------------
 def _default_data() -> Dict[str, Any]:
-    return {"collections": {}}
+    # "collections" maps name -> loaded collection, or None until first use;
+    # "counts" holds the card counts of the ones not loaded yet.
+    return {"collections": {}, "counts": {}}
+
+
+def _new_collection() -> Dict[str, Any]:
+    return {"ids": [], "fronts": [], "backs": [], "next_id": 0}
+
+
+def _collection_from_json(raw: Dict[str, Any]) -> Dict[str, Any]:
+    # The old single-file layout stores a collection as a list of card objects;
+    # in memory each field is its own list so scans walk one compact array
+    # instead of a dict per card.
+    cards = [
+        c for c in raw.get("cards", [])
+        if isinstance(c, dict) and all(isinstance(c.get(k), str) for k in ("id", "front", "back"))
+    ]
+    col = {
+        "ids": [c["id"] for c in cards],
+        "fronts": [c["front"] for c in cards],
+        "backs": [c["back"] for c in cards],
+    }
+    if "next_id" in raw:
+        col["next_id"] = raw["next_id"]
+    return col
+
+
+def _cards_path(col_name: str, suffix: str = ".json") -> str:
+    # Collection names are free text, so name the file after a hash instead.
+    digest = hashlib.sha1(col_name.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(CARDS_DIR, digest + suffix)
+
+
+def _dumps_cards(col: Dict[str, Any]) -> bytes:
+    # A header line with the id counter, then one [id, front, back] array per
+    # line, so the file can be read back a card at a time.
+    header = {"next_id": col["next_id"]} if "next_id" in col else {}
+    lines = [_dumps(header)]
+    lines.extend(_dumps(card) for card in zip(col["ids"], col["fronts"], col["backs"]))
+    lines.append(b"")
+    return b"\n".join(lines)
+
+
+# Read-only copy of a card file for learn mode, mapped instead of parsed:
+# a header (magic, card count), one record per card holding the byte offset
+# and length of its id, front and back, then the UTF-8 text they point into.
+_BIN_MAGIC = b"FCB1"
+_BIN_HEADER = struct.Struct("<4sI")
+_BIN_RECORD = struct.Struct("<6I")
+
+
+def _pack_cards(col: Dict[str, Any]) -> bytes:
+    n = len(col["ids"])
+    base = _BIN_HEADER.size + n * _BIN_RECORD.size
+    records = bytearray()
+    text = bytearray()
+    for fields in zip(col["ids"], col["fronts"], col["backs"]):
+        spans = []
+        for field in fields:
+            raw = field.encode("utf-8")
+            spans += (base + len(text), len(raw))
+            text += raw
+        records += _BIN_RECORD.pack(*spans)
+    return _BIN_HEADER.pack(_BIN_MAGIC, n) + records + text
+
+
+def _map_cards(data: Dict[str, Any], col_name: str) -> Optional[mmap.mmap]:
+    """Map the collection's .bin file, or None if it can't be trusted."""
+    if data["collections"][col_name] is not None:
+        # Loaded collections may hold changes the file doesn't have yet.
+        return None
+    path = _cards_path(col_name, ".bin")
+    try:
+        # Written right after the card file; an older one predates it.
+        if os.path.getmtime(path) < os.path.getmtime(_cards_path(col_name)):
+            return None
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        magic, count = _BIN_HEADER.unpack_from(mm)
+        trusted = (
+            magic == _BIN_MAGIC
+            and count == data["counts"][col_name]
+            and len(mm) >= _BIN_HEADER.size + count * _BIN_RECORD.size
+        )
+        if trusted and count:
+            # Text is written in card order, so the last back ends the file.
+            last = _BIN_RECORD.unpack_from(mm, _BIN_HEADER.size + (count - 1) * _BIN_RECORD.size)
+            trusted = last[4] + last[5] == len(mm)
+        if trusted:
+            # Every span must lie inside the file. The text itself is only
+            # decoded when a card is shown; see learn_mode().
+            end = len(mm)
+            table = mm[_BIN_HEADER.size:_BIN_HEADER.size + count * _BIN_RECORD.size]
+            trusted = all(
+                off + size <= end
+                for spans in _BIN_RECORD.iter_unpack(table)
+                for off, size in zip(spans[::2], spans[1::2])
+            )
+    except struct.error:
+        trusted = False
+    if not trusted:
+        mm.close()
+        return None
+    return mm
 
 
-def load_data() -> Dict[str, Any]:
-    if not os.path.exists(DATA_FILE):
+def _mapped_card(mm: mmap.mmap, n: int) -> Card:
+    spans = _BIN_RECORD.unpack_from(mm, _BIN_HEADER.size + n * _BIN_RECORD.size)
+    fields = []
+    for off, size in zip(spans[::2], spans[1::2]):
+        if off + size > len(mm):
+            raise ValueError(f"card {n} points past the end of the mapped file")
+        fields.append(mm[off:off + size].decode("utf-8"))
+    return Card(*fields)
+
+
+def _read_json(path: str) -> Any:
+    with open(path, "rb") as f:
+        return json.loads(f.read())
+
+
+def _load_collection(col_name: str) -> Dict[str, Any]:
+    # Parse line by line so peak memory is the collection itself plus one
+    # line, rather than the whole file and a parsed copy of it.
+    col = _new_collection()
+    ids, fronts, backs = col["ids"], col["fronts"], col["backs"]
+    skipped = 0
+    try:
+        with open(_cards_path(col_name), "rb") as f:
+            first = f.readline()
+            try:
+                header = json.loads(first)
+            except ValueError:
+                header = None
+            if isinstance(header, dict) and "cards" in header:
+                # Written as a single JSON object before the line format.
+                return _collection_from_json(header)
+            lines = f
+            if not isinstance(header, dict):
+                # Damaged header: keep the counter unset and read the line as a card.
+                header = {}
+                lines = itertools.chain([first], f)
+            for line in lines:
+                if not line.strip():
+                    # E.g. a file left empty by a rename that never hit the disk.
+                    continue
+                # A bad line costs only that card; returning an empty
+                # collection here would overwrite the good ones on next save.
+                try:
+                    card_id, front, back = json.loads(line)
+                except (ValueError, TypeError):
+                    skipped += 1
+                    continue
+                if not all(isinstance(x, str) for x in (card_id, front, back)):
+                    skipped += 1
+                    continue
+                ids.append(card_id)
+                fronts.append(front)
+                backs.append(back)
+    except OSError:
+        return _new_collection()
+    if skipped:
+        _notices.append(f"Skipped {skipped} unreadable line(s) in collection '{col_name}'.")
+    if isinstance(header.get("next_id"), int):
+        col["next_id"] = header["next_id"]
+    else:
+        del col["next_id"]
+    return col
+
+
+def _migrate_data_file() -> Dict[str, Any]:
+    """Split a single-file DATA_FILE into INDEX_FILE plus one file per collection."""
+    data = _default_data()
+    try:
+        raw = _read_json(DATA_FILE)
+        if isinstance(raw, dict) and "collections" in raw:
+            for name, col in raw["collections"].items():
+                data["collections"][name] = _collection_from_json(col)
+    except (ValueError, KeyError, TypeError, OSError):
+        return _default_data()
+    _dirty_cols.update(data["collections"])
+    save_data(data)
+    return data
+
+
+def _load_snapshot() -> Dict[str, Any]:
+    if not os.path.exists(INDEX_FILE):
+        if os.path.exists(DATA_FILE):
+            return _migrate_data_file()
         return _default_data()
     try:
-        with open(DATA_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        if not isinstance(data, dict) or "collections" not in data:
-            return _default_data()
-        return data
-    except (json.JSONDecodeError, OSError):
+        index = _read_json(INDEX_FILE)
+        counts = {name: int(n) for name, n in index["collections"].items()}
+    except (ValueError, KeyError, TypeError, AttributeError, OSError):
         return _default_data()
+    return {"collections": dict.fromkeys(counts), "counts": counts}
+
+
+def load_data() -> Dict[str, Any]:
+    global _cols_cache, _dirty
+    _dirty_cols.clear()
+    _dirty = False
+    data = _load_snapshot()
+    _replay_wal(data)
+    _card_index.clear()
+    _search_cache.clear()
+    _gram_index.clear()
+    _cols_cache = None
+    return data
+
+
+def _dumps(obj: Any) -> bytes:
+    # Without indent, json.dumps runs entirely in the C encoder and returns
+    # one string, so each record goes out in a single write().
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _write_atomic(path: str, payload: bytes) -> None:
+    # Write a sibling file and rename it over path so a crash mid-write
+    # leaves the previous version intact. No fsync here; see commit().
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(payload)
+    os.replace(tmp, path)
+    _unsynced.add(path)
 
 
 def save_data(data: Dict[str, Any]) -> None:
-    with open(DATA_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    """Write the card files of changed collections, then the index."""
+    cols = data["collections"]
+    for name in _dirty_cols:
+        if cols.get(name) is not None:
+            os.makedirs(CARDS_DIR, exist_ok=True)
+            _write_atomic(_cards_path(name), _dumps_cards(cols[name]))
+            _write_atomic(_cards_path(name, ".bin"), _pack_cards(cols[name]))
+    _dirty_cols.clear()
+    counts = {name: card_count(data, name) for name in cols}
+    _write_atomic(INDEX_FILE, _dumps({"collections": counts}))
+
+
+def commit() -> None:
+    """Force files written since the last commit to disk.
+
+    Called before the WAL is truncated and once on exit; individual saves skip it.
+    """
+    dirs = set()
+    for path in _unsynced:
+        try:
+            with open(path, "rb+") as f:
+                os.fsync(f.fileno())
+        except OSError:
+            pass
+        dirs.add(os.path.dirname(os.path.abspath(path)))
+    _unsynced.clear()
+    if os.name == "nt":
+        return
+    # Make the renames themselves durable.
+    for d in dirs:
+        try:
+            fd = os.open(d, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+
+
+def _apply_change(data: Dict[str, Any], change: Dict[str, Any]) -> None:
+    if change["col"] not in data["collections"]:
+        return
+    col = get_collection(data, change["col"])
+    _dirty_cols.add(change["col"])
+    op = change["op"]
+    if op == "delete":
+        try:
+            n = col["ids"].index(change["id"])
+        except ValueError:
+            return
+        del col["ids"][n], col["fronts"][n], col["backs"][n]
+        return
+    card = change["card"]
+    try:
+        n = col["ids"].index(card["id"])
+    except ValueError:
+        if op == "add":
+            col["ids"].append(card["id"])
+            col["fronts"].append(card["front"])
+            col["backs"].append(card["back"])
+            # The snapshot's counter predates this card; reseed on next add.
+            col.pop("next_id", None)
+        return
+    # Adds are applied as upserts: if a compaction wrote the snapshot but died
+    # before truncating the WAL, the card is already there.
+    col["fronts"][n] = card["front"]
+    col["backs"][n] = card["back"]
+
+
+def _is_change(obj: Any) -> bool:
+    if not isinstance(obj, dict) or not isinstance(obj.get("col"), str):
+        return False
+    if obj.get("op") == "delete":
+        return isinstance(obj.get("id"), str)
+    card = obj.get("card")
+    return (
+        obj.get("op") in ("add", "edit")
+        and isinstance(card, dict)
+        and all(isinstance(card.get(k), str) for k in ("id", "front", "back"))
+    )
+
+
+def _replay_wal(data: Dict[str, Any]) -> None:
+    global _dirty
+    try:
+        with open(WAL_FILE, "rb") as f:
+            for line in f:
+                try:
+                    change = json.loads(line)
+                except ValueError:
+                    # Also covers a tail cut off inside a multibyte character.
+                    change = None
+                if not _is_change(change):
+                    # A torn final line from an interrupted write; nothing after
+                    # it. Mark the WAL dirty even if nothing was applied so
+                    # open_wal() compacts it away before appending.
+                    _dirty = True
+                    break
+                _apply_change(data, change)
+                _dirty = True
+    except OSError:
+        pass
+
+
+def open_wal(data: Dict[str, Any]) -> None:
+    global _wal
+    if _wal is not None:
+        return
+    # Fold in anything replayed by load_data, and drop any torn tail it
+    # stopped at, so garbage from a previous run never sits in front of new
+    # entries.
+    if _dirty:
+        _compact(data)
+    _wal = open(WAL_FILE, "ab")
+
+
+def log_change(data: Dict[str, Any], change: Dict[str, Any]) -> None:
+    """Persist a single card change by appending it to the WAL."""
+    global _dirty
+    _dirty_cols.add(change["col"])
+    if _wal is None:
+        save_data(data)
+        return
+    _wal.write(_dumps(change) + b"\n")
+    _wal.flush()
+    _dirty = True
+    if _wal.tell() >= WAL_COMPACT_SIZE:
+        _compact(data)
+
+
+def _compact(data: Dict[str, Any]) -> None:
+    """Write out every pending change and drop the WAL entries it now covers."""
+    global _dirty
+    save_data(data)
+    # The WAL is the only other copy of these changes, so the new files must
+    # be on disk before it is emptied.
+    commit()
+    if _wal is not None:
+        _wal.seek(0)
+        _wal.truncate()
+    elif os.path.exists(WAL_FILE):
+        open(WAL_FILE, "wb").close()
+    _dirty = False
+
+
+def close_wal(data: Dict[str, Any]) -> None:
+    global _wal
+    if _dirty:
+        _compact(data)
+    if _wal is not None:
+        _wal.close()
+        _wal = None
 
 
 # ----------------------------
@@ -39,13 +464,51 @@ def clear() -> None:
     os.system("cls" if os.name == "nt" else "clear")
 
 
+# Bound on first use of each sys.stdin: input() re-checks isatty() on stdin
+# and stdout on every call, which is pure overhead when driven from a pipe.
+_stdin: Any = None
+_readline: Optional[Callable[[], str]] = None
+_interactive = False
+
+_YES_NO = {"y": True, "yes": True, "n": False, "no": False}
+
+
+def ask(prompt: str) -> str:
+    """input(), minus the per-call terminal checks when stdin is not a tty."""
+    global _stdin, _readline, _interactive
+    stdin = sys.stdin
+    if stdin is None:
+        raise EOFError
+    if stdin is not _stdin:
+        _stdin, _readline, _interactive = stdin, stdin.readline, stdin.isatty()
+    if _interactive:
+        return input(prompt)
+    emit(prompt)
+    line = _readline()
+    if not line:
+        raise EOFError
+    return line[:-1] if line.endswith("\n") else line
+
+
+def emit(text: str) -> None:
+    """Write a whole block of output at once instead of line by line."""
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+
+def show_notices() -> None:
+    if _notices:
+        emit("".join(f"{msg}\n" for msg in _notices) + "\n")
+        _notices.clear()
+
+
 def pause(msg: str = "Press Enter to continue...") -> None:
-    input(msg)
+    ask(msg)
 
 
 def prompt_int(prompt: str, lo: int, hi: int) -> int:
     while True:
-        s = input(prompt).strip()
+        s = ask(prompt).strip()
         if s.isdigit():
             v = int(s)
             if lo <= v <= hi:
@@ -55,7 +518,7 @@ def prompt_int(prompt: str, lo: int, hi: int) -> int:
 
 def prompt_nonempty(prompt: str) -> str:
     while True:
-        s = input(prompt).strip()
+        s = ask(prompt).strip()
         if s:
             return s
         print("Input cannot be empty.")
@@ -63,11 +526,13 @@ def prompt_nonempty(prompt: str) -> str:
 
 def confirm(prompt: str) -> bool:
     while True:
-        s = input(f"{prompt} (y/n): ").strip().lower()
-        if s in ("y", "yes"):
-            return True
-        if s in ("n", "no"):
-            return False
+        s = ask(f"{prompt} (y/n): ").strip()
+        answer = _YES_NO.get(s)
+        if answer is None:
+            # Only pay for lower() when the answer wasn't typed in lowercase.
+            answer = _YES_NO.get(s.lower())
+        if answer is not None:
+            return answer
         print("Please type y or n.")
 
 
@@ -91,7 +556,11 @@ def select_from_list(title: str, items: List[str]) -> Optional[str]:
 # Domain operations
 # ----------------------------
 def list_collections(data: Dict[str, Any]) -> List[str]:
-    return sorted(data["collections"].keys())
+    """Sorted collection names. The list is shared; callers must not modify it."""
+    global _cols_cache
+    if _cols_cache is None:
+        _cols_cache = sorted(data["collections"].keys())
+    return _cols_cache
 
 
 def create_collection(data: Dict[str, Any]) -> None:
@@ -99,183 +568,419 @@ def create_collection(data: Dict[str, Any]) -> None:
     if name in data["collections"]:
         print("A collection with that name already exists.")
         return
-    data["collections"][name] = {"cards": []}
-    save_data(data)
+    data["collections"][name] = _new_collection()
+    _dirty_cols.add(name)
+    if _cols_cache is not None:
+        bisect.insort(_cols_cache, name)
+    _compact(data)
     print(f"Created collection '{name}'.")
 
 
 def delete_collection(data: Dict[str, Any]) -> None:
+    global _cols_cache
     cols = list_collections(data)
     name = select_from_list("Delete which collection?", cols)
     if not name:
         return
     if confirm(f"Delete collection '{name}' and ALL its cards?"):
         del data["collections"][name]
-        save_data(data)
+        data["counts"].pop(name, None)
+        _dirty_cols.discard(name)
+        _cols_cache = None
+        _card_index.pop(name, None)
+        _search_cache.pop(name, None)
+        _gram_index.pop(name, None)
+        _compact(data)
+        # Only once the index no longer lists it.
+        for suffix in (".json", ".bin"):
+            try:
+                os.remove(_cards_path(name, suffix))
+            except OSError:
+                pass
         print("Deleted.")
 
 
-def get_cards(data: Dict[str, Any], col_name: str) -> List[Dict[str, str]]:
-    return data["collections"][col_name]["cards"]
+def get_collection(data: Dict[str, Any], col_name: str) -> Dict[str, Any]:
+    """The collection's parallel "ids", "fronts" and "backs" lists, loaded on first use."""
+    col = data["collections"][col_name]
+    if col is None:
+        col = _load_collection(col_name)
+        data["collections"][col_name] = col
+        data["counts"].pop(col_name, None)
+    return col
+
+
+def card_count(data: Dict[str, Any], col_name: str) -> int:
+    col = data["collections"][col_name]
+    if col is None:
+        return data["counts"][col_name]
+    return len(col["ids"])
+
+
+def _new_card_id(data: Dict[str, Any], col_name: str) -> str:
+    col = get_collection(data, col_name)
+    if "next_id" not in col:
+        # Collections saved before ids were sequential hold random hex ids;
+        # start past the largest one.
+        seen = [0]
+        for card_id in col["ids"]:
+            try:
+                seen.append(int(card_id, 16) + 1)
+            except ValueError:
+                pass
+        col["next_id"] = max(seen)
+        if col["next_id"] > 0xFFFFFFFF:
+            # Random ids run right up to ffffffff; counting on from there would
+            # give 9-digit ids. Start at the bottom instead; the check below
+            # still catches any that are taken.
+            col["next_id"] = 0
+    card_id = f"{col['next_id']:08x}"
+    col["next_id"] += 1
+    index = get_index(data, col_name)
+    while card_id in index:
+        card_id = secrets.token_hex(4)
+    return card_id
 
 
 def add_card(data: Dict[str, Any], col_name: str) -> None:
     front = prompt_nonempty("Front: ")
     back = prompt_nonempty("Back: ")
-    card = {"id": uuid.uuid4().hex[:8], "front": front, "back": back}
-    get_cards(data, col_name).append(card)
-    save_data(data)
-    print(f"Added card {card['id']}.")
+    card_id = _new_card_id(data, col_name)
+    col = get_collection(data, col_name)
+    col["ids"].append(card_id)
+    col["fronts"].append(front)
+    col["backs"].append(back)
+    index = _card_index.get(col_name)
+    if index is not None:
+        index[card_id] = len(col["ids"]) - 1
+    _search_cache.pop(col_name, None)
+    _reindex_card(col_name, card_id, None, (front, back))
+    log_change(data, {"op": "add", "col": col_name, "card": _card_json(col, len(col["ids"]) - 1)})
+    print(f"Added card {card_id}.")
+
+
+def get_index(data: Dict[str, Any], col_name: str) -> Dict[str, int]:
+    """Map card id -> position in the collection's arrays, built on first use."""
+    index = _card_index.get(col_name)
+    if index is None:
+        index = {card_id: i for i, card_id in enumerate(get_collection(data, col_name)["ids"])}
+        _card_index[col_name] = index
+    return index
+
 
+def find_card(data: Dict[str, Any], col_name: str, card_id: str) -> Optional[int]:
+    """Position of the card with card_id, or None."""
+    return get_index(data, col_name).get(card_id)
 
-def find_card(cards: List[Dict[str, str]], card_id: str) -> Optional[Dict[str, str]]:
-    for c in cards:
-        if c["id"] == card_id:
-            return c
-    return None
 
+def _card_json(col: Dict[str, Any], n: int) -> Dict[str, str]:
+    return {"id": col["ids"][n], "front": col["fronts"][n], "back": col["backs"][n]}
 
-def list_cards(cards: List[Dict[str, str]]) -> None:
-    if not cards:
+
+def _card_line(col: Dict[str, Any], n: int) -> str:
+    return f"- {col['ids'][n]}: {col['fronts'][n]}  ->  {col['backs'][n]}"
+
+
+def list_cards(col: Dict[str, Any]) -> None:
+    if not col["ids"]:
         print("(No cards yet.)")
         return
-    print(f"Cards ({len(cards)}):")
-    for c in cards:
-        print(f"- {c['id']}: {c['front']}  ->  {c['back']}")
+    print(f"Cards ({len(col['ids'])}):")
+    for n in range(len(col["ids"])):
+        print(_card_line(col, n))
 
 
 def edit_card(data: Dict[str, Any], col_name: str) -> None:
-    cards = get_cards(data, col_name)
-    if not cards:
+    col = get_collection(data, col_name)
+    if not col["ids"]:
         print("No cards to edit.")
         return
 
-    list_cards(cards)
+    list_cards(col)
     card_id = prompt_nonempty("Enter card id to edit: ")
-    card = find_card(cards, card_id)
-    if not card:
+    n = find_card(data, col_name, card_id)
+    if n is None:
         print("Card id not found.")
         return
 
     print("Press Enter to keep the current value.")
-    new_front = input(f"Front [{card['front']}]: ").rstrip("\n")
-    new_back = input(f"Back  [{card['back']}]: ").rstrip("\n")
+    old = (col["fronts"][n], col["backs"][n])
+    new_front = ask(f"Front [{old[0]}]: ")
+    new_back = ask(f"Back  [{old[1]}]: ")
 
     if new_front.strip():
-        card["front"] = new_front.strip()
+        col["fronts"][n] = new_front.strip()
     if new_back.strip():
-        card["back"] = new_back.strip()
+        col["backs"][n] = new_back.strip()
+    new = (col["fronts"][n], col["backs"][n])
+    _search_cache.pop(col_name, None)
+    _reindex_card(col_name, card_id, old, new)
 
-    save_data(data)
+    log_change(data, {"op": "edit", "col": col_name, "card": _card_json(col, n)})
     print("Updated.")
 
 
 def delete_card(data: Dict[str, Any], col_name: str) -> None:
-    cards = get_cards(data, col_name)
-    if not cards:
+    col = get_collection(data, col_name)
+    if not col["ids"]:
         print("No cards to delete.")
         return
 
-    list_cards(cards)
+    list_cards(col)
     card_id = prompt_nonempty("Enter card id to delete: ")
-    card = find_card(cards, card_id)
-    if not card:
+    n = find_card(data, col_name, card_id)
+    if n is None:
         print("Card id not found.")
         return
 
     if confirm(f"Delete card {card_id}?"):
-        cards.remove(card)
-        save_data(data)
+        _reindex_card(col_name, card_id, (col["fronts"][n], col["backs"][n]), None)
+        del col["ids"][n], col["fronts"][n], col["backs"][n]
+        # Later positions shifted down; rebuild the index on next lookup.
+        _card_index.pop(col_name, None)
+        _search_cache.pop(col_name, None)
+        log_change(data, {"op": "delete", "col": col_name, "id": card_id})
         print("Deleted.")
 
 
-def search_cards(cards: List[Dict[str, str]]) -> None:
-    if not cards:
+def get_search_blob(data: Dict[str, Any], col_name: str) -> Tuple[str, List[int]]:
+    """Casefolded text of the whole collection, cached until it changes.
+
+    Each card contributes its front and back, each followed by a newline.
+    Queries come from a single input line and never contain a newline, so a
+    match cannot straddle two cards. Card n spans starts[n]:starts[n + 1].
+    """
+    cached = _search_cache.get(col_name)
+    if cached is None:
+        col = get_collection(data, col_name)
+        # Built with map/accumulate so the per-card work runs in C.
+        texts = list(map(str.casefold, map("{}\n{}\n".format, col["fronts"], col["backs"])))
+        starts = list(itertools.accumulate(map(len, texts), initial=0))
+        cached = ("".join(texts), starts)
+        _search_cache[col_name] = cached
+    return cached
+
+
+def _card_grams(front: str, back: str) -> Set[str]:
+    text = f"{front}\n{back}".casefold()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def get_gram_index(data: Dict[str, Any], col_name: str) -> Dict[str, Set[str]]:
+    """Trigram -> card ids for the collection, built on first use."""
+    grams = _gram_index.get(col_name)
+    if grams is None:
+        grams = {}
+        col = get_collection(data, col_name)
+        for card_id, front, back in zip(col["ids"], col["fronts"], col["backs"]):
+            for g in _card_grams(front, back):
+                grams.setdefault(g, set()).add(card_id)
+        _gram_index[col_name] = grams
+    return grams
+
+
+def _reindex_card(
+    col_name: str,
+    card_id: str,
+    old: Optional[Tuple[str, str]],
+    new: Optional[Tuple[str, str]],
+) -> None:
+    """Move a card's postings from its old (front, back) to its new one (None = absent)."""
+    grams = _gram_index.get(col_name)
+    if grams is None:
+        return
+    old_grams = _card_grams(*old) if old else set()
+    new_grams = _card_grams(*new) if new else set()
+    for g in old_grams - new_grams:
+        ids = grams[g]
+        ids.discard(card_id)
+        if not ids:
+            del grams[g]
+    for g in new_grams - old_grams:
+        grams.setdefault(g, set()).add(card_id)
+
+
+def find_matches(data: Dict[str, Any], col_name: str, q: str) -> List[int]:
+    """Positions of the cards whose front or back contains q (already casefolded)."""
+    blob, starts = get_search_blob(data, col_name)
+    if len(q) >= 3:
+        # Every trigram of q must occur in a matching card, so intersecting
+        # the postings gives a small candidate set to verify against the blob.
+        grams = get_gram_index(data, col_name)
+        postings = sorted((grams.get(q[i:i + 3], set()) for i in range(len(q) - 2)), key=len)
+        candidates = postings[0].intersection(*postings[1:])
+        index = get_index(data, col_name)
+        found = []
+        for n in sorted(index[cid] for cid in candidates):
+            if blob.find(q, starts[n], starts[n + 1]) != -1:
+                found.append(n)
+        return found
+
+    # Too short for the trigram index: one str.find pass over the whole
+    # collection, resuming at the next card after a hit so each card is
+    # reported once. The trailing entry in starts ends the loop.
+    found = []
+    i = blob.find(q)
+    while i != -1:
+        n = bisect.bisect_right(starts, i) - 1
+        found.append(n)
+        i = blob.find(q, starts[n + 1])
+    return found
+
+
+def search_cards(data: Dict[str, Any], col_name: str) -> None:
+    col = get_collection(data, col_name)
+    if not col["ids"]:
         print("No cards to search.")
         return
-    q = prompt_nonempty("Search text: ").lower()
-    hits = [c for c in cards if q in c["front"].lower() or q in c["back"].lower()]
+    # casefold() rather than lower() so e.g. "STRASSE" finds "Straße"; it
+    # has the same ASCII fast path in CPython.
+    q = prompt_nonempty("Search text: ").casefold()
+    hits = find_matches(data, col_name, q)
     if not hits:
         print("No matches.")
         return
     print(f"Matches ({len(hits)}):")
-    for c in hits:
-        print(f"- {c['id']}: {c['front']}  ->  {c['back']}")
+    for n in hits:
+        print(_card_line(col, n))
 
 
 # ----------------------------
 # Learn mode
 # ----------------------------
+_LEARN_MENU = "Learn mode:\n  1) In order\n  2) Random\n"
+
+_LEARN_ANSWERS = {
+    "y": "y", "yes": "y",
+    "n": "n", "no": "n",
+    "s": "s", "skip": "s",
+    "q": "q", "quit": "q",
+}
+
+
 def learn_mode(data: Dict[str, Any], col_name: str) -> None:
-    cards = list(get_cards(data, col_name))
-    if not cards:
+    # Studying doesn't change anything, so a collection that hasn't been
+    # loaded yet is read straight from its mapped .bin file.
+    mm = _map_cards(data, col_name)
+    if mm is not None:
+        count = _BIN_HEADER.unpack_from(mm)[1]
+        card_at: Callable[[int], Card] = functools.partial(_learn_card, data, col_name, mm)
+    else:
+        col = get_collection(data, col_name)
+        count = len(col["ids"])
+        card_at = functools.partial(get_card, col)
+    try:
+        _learn_session(col_name, count, card_at)
+    finally:
+        if mm is not None:
+            mm.close()
+
+
+def _learn_card(data: Dict[str, Any], col_name: str, mm: mmap.mmap, n: int) -> Card:
+    try:
+        return _mapped_card(mm, n)
+    except ValueError:
+        # Bad UTF-8 in the .bin. It is only a copy of the card file, so read
+        # the card from there rather than ending the session.
+        return get_card(get_collection(data, col_name), n)
+
+
+def _learn_session(
+    col_name: str, count: int, card_at: Callable[[int], Card]
+) -> None:
+    if not count:
         print("No cards to learn yet.")
         return
 
-    print("Learn mode:")
-    print("  1) In order")
-    print("  2) Random")
-    order = prompt_int("Choose: ", 1, 2)
-    if order == 2:
-        random.shuffle(cards)
+    emit(_LEARN_MENU)
+    mode = prompt_int("Choose: ", 1, 2)
+    # Shuffle a compact array of positions rather than a copy of the card list.
+    order = array.array("I", range(count))
+    if mode == 2:
+        random.shuffle(order)
 
     correct = 0
     wrong = 0
     skipped = 0
 
-    for idx, c in enumerate(cards, start=1):
+    for idx, pos in enumerate(order, start=1):
+        c = card_at(pos)
         clear()
-        print(f"[{col_name}] Card {idx}/{len(cards)}  (id: {c['id']})")
-        print("-" * 40)
-        print("FRONT:")
-        print(c["front"])
-        print("-" * 40)
-        input("Press Enter to reveal the back...")
+        rule = "-" * 40
+        emit(
+            f"[{col_name}] Card {idx}/{count}  (id: {c.id})\n"
+            f"{rule}\nFRONT:\n{c.front}\n{rule}\n"
+        )
+        ask("Press Enter to reveal the back...")
 
-        print("\nBACK:")
-        print(c["back"])
-        print("-" * 40)
+        emit(f"\nBACK:\n{c.back}\n{rule}\n")
 
         while True:
-            ans = input("Got it? (y/n/skip/q): ").strip().lower()
-            if ans in ("y", "yes"):
+            ans = ask("Got it? (y/n/skip/q): ").strip()
+            verdict = _LEARN_ANSWERS.get(ans) or _LEARN_ANSWERS.get(ans.lower())
+            if verdict == "y":
                 correct += 1
                 break
-            if ans in ("n", "no"):
+            if verdict == "n":
                 wrong += 1
                 break
-            if ans in ("s", "skip"):
+            if verdict == "s":
                 skipped += 1
                 break
-            if ans in ("q", "quit"):
+            if verdict == "q":
                 clear()
-                print("Session ended early.")
-                print(f"Correct: {correct}, Wrong: {wrong}, Skipped: {skipped}")
+                emit(
+                    "Session ended early.\n"
+                    f"Correct: {correct}, Wrong: {wrong}, Skipped: {skipped}\n"
+                )
                 return
             print("Please enter y, n, skip, or q.")
 
     clear()
-    print("Done!")
-    print(f"Correct: {correct}")
-    print(f"Wrong:   {wrong}")
-    print(f"Skipped: {skipped}")
+    emit(f"Done!\nCorrect: {correct}\nWrong:   {wrong}\nSkipped: {skipped}\n")
 
 
 # ----------------------------
 # Menus
 # ----------------------------
+_MAIN_MENU = (
+    "Terminal Flashcards\n"
+    "--------------------\n"
+    "Collections: {}\n"
+    "  1) Create collection\n"
+    "  2) Open collection\n"
+    "  3) List collections\n"
+    "  4) Delete collection\n"
+    "  0) Exit\n"
+)
+
+_COLLECTION_MENU = (
+    "Collection: {}  |  Cards: {}\n"
+    "  1) Learn\n"
+    "  2) Add card\n"
+    "  3) Manage cards\n"
+    "  0) Back\n"
+)
+
+_MANAGE_CARDS_MENU = (
+    "Collection: {}  |  Cards: {}\n"
+    "Manage cards\n"
+    "  1) List cards\n"
+    "  2) Add card\n"
+    "  3) Edit card\n"
+    "  4) Delete card\n"
+    "  5) Search\n"
+    "  0) Back\n"
+)
+
+
 def manage_cards_menu(data: Dict[str, Any], col_name: str) -> None:
+    # Card operations mutate these lists in place, so one lookup stays valid.
+    col = get_collection(data, col_name)
     while True:
         clear()
-        cards = get_cards(data, col_name)
-        print(f"Collection: {col_name}  |  Cards: {len(cards)}")
-        print("Manage cards")
-        print("  1) List cards")
-        print("  2) Add card")
-        print("  3) Edit card")
-        print("  4) Delete card")
-        print("  5) Search")
-        print("  0) Back")
+        show_notices()
+        emit(_MANAGE_CARDS_MENU.format(col_name, len(col["ids"])))
 
         choice = prompt_int("Choose: ", 0, 5)
         clear()
@@ -283,7 +988,7 @@ def manage_cards_menu(data: Dict[str, Any], col_name: str) -> None:
         if choice == 0:
             return
         elif choice == 1:
-            list_cards(cards)
+            list_cards(col)
             pause()
         elif choice == 2:
             add_card(data, col_name)
@@ -295,19 +1000,17 @@ def manage_cards_menu(data: Dict[str, Any], col_name: str) -> None:
             delete_card(data, col_name)
             pause()
         elif choice == 5:
-            search_cards(cards)
+            search_cards(data, col_name)
             pause()
 
 
 def collection_menu(data: Dict[str, Any], col_name: str) -> None:
+    # The count comes from the index so that opening a collection just to
+    # study it never loads its card file.
     while True:
         clear()
-        cards = get_cards(data, col_name)
-        print(f"Collection: {col_name}  |  Cards: {len(cards)}")
-        print("  1) Learn")
-        print("  2) Add card")
-        print("  3) Manage cards")
-        print("  0) Back")
+        show_notices()
+        emit(_COLLECTION_MENU.format(col_name, card_count(data, col_name)))
 
         choice = prompt_int("Choose: ", 0, 3)
         clear()
@@ -334,18 +1037,20 @@ def open_collection(data: Dict[str, Any]) -> None:
 
 def main() -> None:
     data = load_data()
+    open_wal(data)
+    try:
+        _main_menu(data)
+    finally:
+        close_wal(data)
+        commit()
+
 
+def _main_menu(data: Dict[str, Any]) -> None:
     while True:
         clear()
+        show_notices()
         cols = list_collections(data)
-        print("Terminal Flashcards")
-        print("-" * 20)
-        print(f"Collections: {len(cols)}")
-        print("  1) Create collection")
-        print("  2) Open collection")
-        print("  3) List collections")
-        print("  4) Delete collection")
-        print("  0) Exit")
+        emit(_MAIN_MENU.format(len(cols)))
 
         choice = prompt_int("Choose: ", 0, 4)
         clear()
@@ -364,7 +1069,7 @@ def main() -> None:
                 print("(No collections yet.)")
             else:
                 for c in cols:
-                    print(f"- {c} ({len(get_cards(data, c))} cards)")
+                    print(f"- {c} ({card_count(data, c)} cards)")
             pause()
         elif choice == 4:
             delete_collection(data)
@@ -0,0 +1,175 @@
+import io
+import os
+
+from flashcards import app
+
+
+def test_replayed_add_already_in_snapshot_is_not_duplicated(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data = app.load_data()
+    data["collections"]["deck"] = app._new_collection()
+    col = app.get_collection(data, "deck")
+    card = {"id": "00000000", "front": "front1", "back": "back1"}
+    col["ids"].append(card["id"])
+    col["fronts"].append(card["front"])
+    col["backs"].append(card["back"])
+    with open(app.WAL_FILE, "wb") as f:
+        f.write(app._dumps({"op": "add", "col": "deck", "card": card}) + b"\n")
+    # Snapshot written, WAL not truncated: a crash in the middle of _compact.
+    app._dirty_cols.add("deck")
+    app.save_data(data)
+
+    data = app.load_data()
+    col = app.get_collection(data, "deck")
+    assert col["ids"] == ["00000000"]
+    assert col["fronts"] == ["front1"]
+    assert col["backs"] == ["back1"]
+
+
+def test_unreadable_wal_tail_ends_replay(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    good = app._dumps({"op": "add", "col": "deck", "card": {"id": "00000000", "front": "a", "back": "b"}})
+    data = app.load_data()
+    data["collections"]["deck"] = app._new_collection()
+    app._dirty_cols.add("deck")
+    app.save_data(data)
+    # Cut off inside the two-byte encoding of "ß", and a valid line that isn't a change.
+    for tail in (b'{"op":"add","col":"deck","card":{"id":"x","front":"\xc3', b"[1,2]\n"):
+        with open(app.WAL_FILE, "wb") as f:
+            f.write(good + b"\n" + tail)
+        data = app.load_data()
+        assert app.get_collection(data, "deck")["ids"] == ["00000000"]
+
+
+def test_torn_first_wal_line_does_not_hide_later_entries(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data = app.load_data()
+    data["collections"]["deck"] = app._new_collection()
+    app._dirty_cols.add("deck")
+    app.save_data(data)
+    with open(app.WAL_FILE, "wb") as f:
+        f.write(b'{"op":"add","col":"de')
+
+    data = app.load_data()
+    app.open_wal(data)
+    col = app.get_collection(data, "deck")
+    col["ids"].append("00000000")
+    col["fronts"].append("a")
+    col["backs"].append("b")
+    app.log_change(data, {"op": "add", "col": "deck", "card": app._card_json(col, 0)})
+    # Crash: the WAL is left as is, without close_wal().
+    app._wal.close()
+    app._wal = None
+
+    data = app.load_data()
+    assert app.get_collection(data, "deck")["ids"] == ["00000000"]
+
+
+def _save_deck(fronts, backs):
+    data = app.load_data()
+    ids = [f"{i:08x}" for i in range(len(fronts))]
+    data["collections"]["deck"] = {"ids": ids, "fronts": list(fronts), "backs": list(backs), "next_id": len(ids)}
+    app._dirty_cols.add("deck")
+    app.save_data(data)
+    # Reload so the collection is unloaded and eligible for mapping.
+    return app.load_data()
+
+
+def test_mapped_cards_round_trip_non_ascii(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fronts = ["Straße", "日本語", ""]
+    backs = ["street", "にほんご 🎌", "é"]
+    data = _save_deck(fronts, backs)
+    mm = app._map_cards(data, "deck")
+    assert mm is not None
+    try:
+        cards = [app._mapped_card(mm, n) for n in range(3)]
+    finally:
+        mm.close()
+    assert [c.id for c in cards] == ["00000000", "00000001", "00000002"]
+    assert [c.front for c in cards] == fronts
+    assert [c.back for c in cards] == backs
+
+
+def test_stale_bin_is_not_mapped(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data = _save_deck(["a", "b"], ["c", "d"])
+    bin_path = app._cards_path("deck", ".bin")
+    json_mtime = os.path.getmtime(app._cards_path("deck"))
+    os.utime(bin_path, (json_mtime - 10, json_mtime - 10))
+    assert app._map_cards(data, "deck") is None
+
+    data = _save_deck(["a", "b"], ["c", "d"])
+    data["counts"]["deck"] = 3
+    assert app._map_cards(data, "deck") is None
+
+
+def test_truncated_bin_is_not_mapped(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    bin_path = app._cards_path("deck", ".bin")
+    for cut in (1, app._BIN_RECORD.size, None):
+        data = _save_deck(["front"], ["back"])
+        with open(bin_path, "rb") as f:
+            raw = f.read()
+        # None: shorter than the header itself.
+        raw = raw[:2] if cut is None else raw[:-cut]
+        with open(bin_path, "wb") as f:
+            f.write(raw)
+        assert app._map_cards(data, "deck") is None
+
+
+def _assert_search_matches_brute_force(data, queries):
+    col = app.get_collection(data, "deck")
+    for q in queries:
+        q = q.casefold()
+        expected = [
+            n for n in range(len(col["ids"]))
+            if q in col["fronts"][n].casefold() or q in col["backs"][n].casefold()
+        ]
+        assert app.find_matches(data, "deck", q) == expected, q
+
+
+def test_find_matches_agrees_with_brute_force(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    data = _save_deck(
+        ["Straße", "STRASSE", "cat", "concatenate", "ab", ""],
+        ["street", "Street", "Katze", "join", "ba", "xyz"],
+    )
+    queries = ["s", "ss", "ß", "strasse", "STRASSE", "straße", "cat", "at", "a", "te", "ab", "zz", "xyz"]
+    # Build the trigram index first so the edits below go through _reindex_card.
+    app.get_gram_index(data, "deck")
+    _assert_search_matches_brute_force(data, queries)
+
+    monkeypatch.setattr("sys.stdin", io.StringIO(
+        "Fußball\nstrasse\n"          # add
+        "00000002\nscatter\n\n"       # edit: new front, keep back
+        "00000000\ny\n"               # delete
+    ))
+    app.add_card(data, "deck")
+    _assert_search_matches_brute_force(data, queries + ["fussball", "ßb"])
+    app.edit_card(data, "deck")
+    _assert_search_matches_brute_force(data, queries + ["scat", "tter"])
+    app.delete_card(data, "deck")
+    _assert_search_matches_brute_force(data, queries + ["fussball", "scat"])
+
+
+def test_empty_card_file_loads_without_notice(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(app, "_notices", [])
+    _save_deck(["a"], ["b"])
+    with open(app._cards_path("deck"), "wb"):
+        pass
+    data = app.load_data()
+    assert app.get_collection(data, "deck")["ids"] == []
+    assert app._notices == []
+
+
+def test_bad_card_line_is_skipped_and_reported(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(app, "_notices", [])
+    _save_deck(["a", "b"], ["c", "d"])
+    with open(app._cards_path("deck"), "ab") as f:
+        f.write(b'["00000009",\n\n')
+    data = app.load_data()
+    assert app.get_collection(data, "deck")["fronts"] == ["a", "b"]
+    assert app._notices == ["Skipped 1 unreadable line(s) in collection 'deck'."]